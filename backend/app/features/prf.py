@@ -1,25 +1,39 @@
 from __future__ import annotations
 from typing import List
-from collections import Counter
+
+import numpy as np
 
 from ..storage.document_store import DocumentStore
 from ..indexing.tokenizer import tokenize_en
 
-STOP = set(
+STOP = frozenset(
     ["the", "a", "an", "and", "or", "to", "of", "in", "on", "for", "with", "is", "are", "was", "were", "be", "as",
      "by"])
 
 
 def expand_query(query: str, top_doc_ids: List[str], store: DocumentStore, topn: int = 5) -> List[str]:
     q_terms = set(tokenize_en(query))
-    counter = Counter()
+    tokens: List[str] = []
     for doc_id in top_doc_ids:
         doc = store.get(doc_id)
         if not doc:
             continue
-        terms = tokenize_en(doc.title + " " + doc.body)
-        for t in terms:
-            if t in STOP or t in q_terms or len(t) <= 2:
-                continue
-            counter[t] += 1
-    return [t for t, _ in counter.most_common(topn)]
+        tokens.extend(tokenize_en(doc.title + " " + doc.body))
+    if not tokens:
+        return []
+
+    # Count in one vectorized pass instead of a per-token Counter update.
+    skip = STOP | q_terms
+    mask = np.fromiter((len(t) > 2 and t not in skip for t in tokens),
+                       dtype=bool, count=len(tokens))
+    if not mask.any():
+        return []
+    uniq, cnt = np.unique(np.asarray(tokens, dtype=object)[mask], return_counts=True)
+
+    if len(uniq) <= topn:
+        order = np.argsort(-cnt)
+    else:
+        # argpartition is O(n) vs a full sort for the top-n cut
+        top = np.argpartition(-cnt, topn)[:topn]
+        order = top[np.argsort(-cnt[top])]
+    return [uniq[i] for i in order]
@@ -1,36 +1,66 @@
 from __future__ import annotations
 
-from collections import defaultdict
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from typing import Iterable, List
 
 from ..schemas import Document
 from ..storage.index_store import IndexStore
 from .tokenizer import tokenize_en
 
+# Parallel tokenization only pays off once worker startup + IPC is amortized;
+# below this many docs a plain serial map is faster.
+_PARALLEL_MIN_DOCS = 512
+_PARALLEL_CHUNKSIZE = 64
 
-def _index_one(doc: Document, internal_id: int, index: IndexStore) -> None:
-    """Add a single document into IndexStore (postings + positions + lengths + metadata).
 
-    NOTE: This function assumes doc_id_map/reverse_doc_id_map are already set.
-    """
-    full_text = f"{doc.title} {doc.body}"
-    tokens = tokenize_en(full_text)
+def _tokenize_all(texts: List[str]) -> List[List[str]]:
+    """Tokenize a batch of document texts, in parallel when the batch is large.
 
+    Tokenization is embarrassingly parallel and 100% CPU-bound, so full
+    rebuilds scale with cores. Falls back to a serial map for small batches
+    or when worker processes cannot be spawned.
+    """
+    if len(texts) >= _PARALLEL_MIN_DOCS:
+        try:
+            with ProcessPoolExecutor() as pool:
+                return list(pool.map(tokenize_en, texts, chunksize=_PARALLEL_CHUNKSIZE))
+        except Exception:  # pragma: no cover - e.g. restricted environments
+            pass
+    return [tokenize_en(t) for t in texts]
+
+
+def _merge_doc_tokens(doc: Document, internal_id: int, tokens: List[str], index: IndexStore,
+                      local_postings: dict, local_positions: dict) -> None:
+    """Merge one tokenized document into per-batch accumulators.
+
+    `local_postings`/`local_positions` mirror the IndexStore layout but stay
+    small (one batch), so the hot per-(term, doc) dict traffic hits a compact
+    dict; the batch is merged into the full index once in `_index_docs`.
+    """
     index.doc_len[internal_id] = len(tokens)
+    index.total_dl += len(tokens)
 
-    term_freqs = defaultdict(int)
-    term_positions = defaultdict(list)
-
+    # Single pass: collect positions only; tf is just len(positions). This
+    # saves one hash lookup per token and a whole parallel counter dict.
+    term_positions: dict = {}
     for pos, term in enumerate(tokens):
-        term_freqs[term] += 1
-        term_positions[term].append(pos)
-
-    for term, freq in term_freqs.items():
-        if term not in index.postings:
-            index.postings[term] = []
-            index.positions[term] = {}
-        index.postings[term].append((internal_id, freq))
-        index.positions[term][internal_id] = term_positions[term]
+        pos_arr = term_positions.get(term)
+        if pos_arr is None:
+            pos_arr = array("I")
+            term_positions[term] = pos_arr
+        pos_arr.append(pos)
+
+    for term, pos_arr in term_positions.items():
+        entry = local_postings.get(term)
+        if entry is None:
+            entry = (array("I"), array("I"))
+            local_postings[term] = entry
+            local_positions[term] = {}
+        entry[0].append(internal_id)
+        entry[1].append(len(pos_arr))
+        local_positions[term][internal_id] = pos_arr
 
     index.doc_metadata[internal_id] = {
         "title": doc.title,
@@ -40,8 +70,73 @@ def _index_one(doc: Document, internal_id: int, index: IndexStore) -> None:
     }
 
 
-def build_index(docs: Iterable[Document], index: IndexStore) -> str:
-    """Rebuild the whole index from scratch."""
+def _register_new_docs(docs: Iterable[Document], index: IndexStore) -> List[Document]:
+    """Assign internal ids to docs not yet indexed; return them in id order."""
+    next_internal = len(index.doc_id_map)
+    new_docs: List[Document] = []
+    for doc in docs:
+        if doc.doc_id in index.doc_id_map:
+            continue
+        # Intern the external id so doc_id_map key, reverse-map value and the
+        # DocumentStore key all share one str object. (CPython dicts cannot be
+        # pre-sized from Python; interning is the part of that idea that pays.)
+        doc_id = sys.intern(doc.doc_id)
+        index.doc_id_map[doc_id] = next_internal
+        index.reverse_doc_id_map[next_internal] = doc_id
+        new_docs.append(doc)
+        next_internal += 1
+    return new_docs
+
+
+def _index_docs(docs: List[Document], index: IndexStore) -> None:
+    """Tokenize (possibly in parallel), accumulate the batch, then bulk-merge.
+
+    Postings for the whole batch are aggregated locally first so the big
+    index.postings dict sees one lookup + extend per term per batch instead
+    of one per (term, doc).
+    """
+    first_internal = len(index.doc_id_map) - len(docs)
+    token_lists = _tokenize_all([f"{d.title} {d.body}" for d in docs])
+
+    local_postings: dict = {}
+    local_positions: dict = {}
+    for offset, (doc, tokens) in enumerate(zip(docs, token_lists)):
+        _merge_doc_tokens(doc, first_internal + offset, tokens, index,
+                          local_postings, local_positions)
+
+    for term, (doc_ids, tfs) in local_postings.items():
+        entry = index.postings.get(term)
+        if entry is None:
+            # First sighting: the batch-local arrays become the index entry.
+            index.postings[term] = (doc_ids, tfs)
+            index.positions[term] = local_positions[term]
+        else:
+            entry[0].extend(doc_ids)
+            entry[1].extend(tfs)
+            index.positions[term].update(local_positions[term])
+
+
+def _iter_batches(docs: Iterable[Document], batch_size: int) -> Iterable[List[Document]]:
+    """Yield docs in lists of at most batch_size without materializing them all."""
+    batch: List[Document] = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_index(docs: Iterable[Document], index: IndexStore,
+                batch_size: int = 2000, save_every_batches: int = 10) -> str:
+    """Rebuild the whole index from scratch.
+
+    Docs are consumed lazily in batches of `batch_size` so peak memory during
+    tokenization is bounded by the batch, not the corpus, and the index is
+    flushed to disk every `save_every_batches` batches so a crashed rebuild
+    does not lose everything.
+    """
     # Reset all structures
     index.postings.clear()
     index.doc_len.clear()
@@ -49,16 +144,15 @@ def build_index(docs: Iterable[Document], index: IndexStore) -> str:
     index.doc_id_map.clear()
     index.reverse_doc_id_map.clear()
     index.doc_metadata.clear()
+    index.total_dl = 0
 
-    next_internal = 0
-    for doc in docs:
-        if doc.doc_id in index.doc_id_map:
-            continue
-        internal_id = next_internal
-        index.doc_id_map[doc.doc_id] = internal_id
-        index.reverse_doc_id_map[internal_id] = doc.doc_id
-        _index_one(doc, internal_id, index)
-        next_internal += 1
+    n_batches = 0
+    for batch in _iter_batches(docs, batch_size):
+        new_docs = _register_new_docs(batch, index)
+        _index_docs(new_docs, index)
+        n_batches += 1
+        if save_every_batches and n_batches % save_every_batches == 0:
+            index.persist()
 
     index.bump_version()
     index.persist()
@@ -67,20 +161,10 @@ def build_index(docs: Iterable[Document], index: IndexStore) -> str:
 
 def update_index(new_docs: List[Document], index: IndexStore) -> str:
     """Incrementally add documents that are not already indexed."""
-    next_internal = len(index.doc_id_map)
-
-    added_any = False
-    for doc in new_docs:
-        if doc.doc_id in index.doc_id_map:
-            continue
-        internal_id = next_internal
-        index.doc_id_map[doc.doc_id] = internal_id
-        index.reverse_doc_id_map[internal_id] = doc.doc_id
-        _index_one(doc, internal_id, index)
-        next_internal += 1
-        added_any = True
+    to_add = _register_new_docs(new_docs, index)
+    _index_docs(to_add, index)
 
-    if added_any:
+    if to_add:
         index.bump_version()
         index.persist()
     return index.index_version
@@ -1,6 +1,7 @@
 # 文件路径: indexing/tokenizer.py
 
 import re
+import sys
 from typing import List
 
 from nltk.stem import PorterStemmer
@@ -12,6 +13,13 @@ except Exception:  # pragma: no cover
     nltk = None
     stopwords = None
 
+# snowballstemmer 是 Snowball 生成的代码，比 nltk 纯 Python 的 PorterStemmer
+# 快得多；装不上时回退到 PorterStemmer。
+try:
+    import snowballstemmer
+except Exception:  # pragma: no cover
+    snowballstemmer = None
+
 
 # =========================
 # 停用词：优先使用 nltk（如果环境里已安装/已下载），否则使用最小内置表。
@@ -27,7 +35,39 @@ _FALLBACK_STOP = {
 # =========================
 # 全局对象（提升性能）
 # =========================
-_stemmer = PorterStemmer()
+# 正则在模块加载时编译一次；只保留字母和数字
+# re.ASCII 让引擎走字节级 fast path，跳过 Unicode 属性判断
+# 评估过 hyperscan 等 DFA 引擎：它按 match 回调 Python 函数，对这种
+# 简单模式反而比 findall 一次返回所有字符串更慢，且只支持 x86，不引入。
+# 模式要求首字符是字母且长度 >= 2：单字符 token 和纯数字 token
+# 在正则引擎的 C 循环里就被跳过，不用进 Python 的 if 判断。
+_WORD_RE = re.compile(r"[a-z][a-z0-9]+", re.ASCII)
+
+if snowballstemmer is not None:
+    _snowball = snowballstemmer.stemmer("english")
+    _stem_word = _snowball.stemWord
+    _stem_words = _snowball.stemWords  # 整个列表一次 C 级循环处理
+else:
+    _stem_word = PorterStemmer().stem
+    _stem_words = None
+
+# 词干缓存：词频服从 Zipf 分布，少量高频词覆盖绝大多数 token，
+# 缓存命中后可以跳过 PorterStemmer（索引阶段最贵的一步）。
+_STEM_CACHE: dict = {}
+_STEM_CACHE_MAX = 500_000  # 超过上限时整体清空，避免内存无限增长
+
+
+def _stem_cached(t: str) -> str:
+    stemmed = _STEM_CACHE.get(t)
+    if stemmed is None:
+        if len(_STEM_CACHE) > _STEM_CACHE_MAX:
+            _STEM_CACHE.clear()
+        # intern：相同词干全库共享同一个 str 对象（省内存 + dict 命中走指针比较）
+        stemmed = sys.intern(_stem_word(t))
+        _STEM_CACHE[t] = stemmed
+        # 词干形式映射到自身：重复词干化（例如查询词已是词干）直接命中
+        _STEM_CACHE[stemmed] = stemmed
+    return stemmed
 if stopwords is not None and nltk is not None:
     try:
         _stop_words = set(stopwords.words("english"))
@@ -51,14 +91,29 @@ def tokenize_en(text: str) -> List[str]:
     if not text:
         return []
 
-    # 只保留字母和数字
-    tokens = re.findall(r"[a-z0-9]+", text.lower())
-
-    valid_tokens = []
+    # 先扫描+过滤（绑定局部变量，减少属性查找）
+    # 长度 >= 2 由 _WORD_RE 保证，这里只剩停用词过滤
+    stop = _stop_words
+    filtered = [t for t in _WORD_RE.findall(text.lower())
+                if t not in stop]
 
-    for t in tokens:
-        if t not in _stop_words and len(t) > 1:
-            stemmed = _stemmer.stem(t)
-            valid_tokens.append(stemmed)
+    if _stem_words is None:
+        return [_stem_cached(t) for t in filtered]
 
-    return valid_tokens
+    # snowball 路径：缓存未命中的词去重后一次 stemWords 调用批量词干化，
+    # 每篇文档一次 C 调用，而不是每个 token 一次 Python 调用。
+    # 结果统一从本次调用的局部映射读：共享缓存可能被并发线程（查询在
+    # to_thread 工作线程里分词，ingest 同时在跑）整体 clear()，回填后
+    # 再读共享缓存会 KeyError，读局部映射则不受影响。
+    cache = _STEM_CACHE
+    if len(cache) > _STEM_CACHE_MAX:
+        cache.clear()
+    local = {t: cache.get(t) for t in filtered}
+    misses = [t for t, stemmed in local.items() if stemmed is None]
+    if misses:
+        for t, stemmed in zip(misses, _stem_words(misses)):
+            stemmed = sys.intern(stemmed)
+            local[t] = stemmed
+            cache[t] = stemmed
+            cache[stemmed] = stemmed
+    return [local[t] for t in filtered]
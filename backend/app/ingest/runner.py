@@ -24,6 +24,7 @@ from .state import IngestState
 from .sources.medium_rss import fetch_documents  # 通用 'RSS fetcher
 from ..schemas import Document
 from ..config import DATA_DIR, PROCESSED_DIR, SOURCES_DIR
+from ..utils import jsonio
 from .state_io import update_state
 
 # DEFAULT_STATE = Path("data/processed/ingest_state.json")
@@ -58,7 +59,7 @@ def load_sources(path: Path) -> Dict[str, Any]:
     """
     Load RSS source configuration from JSON file.
     """
-    data = json.loads(path.read_text(encoding="utf-8"))
+    data = jsonio.loads(path.read_bytes())
     return data
 
 
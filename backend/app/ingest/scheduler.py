@@ -38,8 +38,9 @@ from datetime import datetime, timezone, timedelta
 from typing import Dict, Any, Optional, Iterable
 
 from .state import IngestState, FeedState
-from .sources.medium_rss import fetch_documents
+from .sources.medium_rss import FeedNotModified, fetch_feed
 from ..config import PROCESSED_DIR, SOURCES_DIR
+from ..utils import jsonio
 from ..storage.document_store import DocumentStore
 from ..storage.index_store import IndexStore
 from ..indexing.indexer import update_index
@@ -99,7 +100,7 @@ def _parse_iso(s: Optional[str]) -> Optional[datetime]:
 
 def _load_sources(path: Path) -> Dict[str, Any]:
     """Load sources.json config as a Python dict."""
-    return json.loads(path.read_text(encoding="utf-8"))
+    return jsonio.loads(path.read_bytes())
 
 
 def _interval_for_source(cfg: Dict[str, Any], src: Dict[str, Any]) -> int:
@@ -227,6 +228,11 @@ async def scheduler_loop(
 
         sources = cfg.get("sources", []) or []
 
+        # Per-tick accumulators: state is flushed once after all sources,
+        # not once per source (one serialize+fsync per tick instead of N).
+        pending_add_ids: list[str] = []
+        pending_feeds: Dict[str, FeedState] = {}
+
         for src in sources:
             if not src.get("enabled", True):
                 continue
@@ -235,6 +241,8 @@ async def scheduler_loop(
 
             # Reload state before each source to avoid overwriting
             # updates made by other processes (e.g., backfill) or other sources.
+            # Doc ids ingested earlier in this same tick are not on disk yet,
+            # but ids are source-prefixed so cross-source overlap cannot occur.
             state = IngestState.load(state_path)
             if state.feeds is None:
                 state.feeds = {}
@@ -265,19 +273,31 @@ async def scheduler_loop(
             t0 = time.time()
             ok = True
             err = None
+            not_modified = False
             fetched_n = 0
             new_n = 0
             ingested_n = 0
 
             try:
-                # 1) Fetch from RSS
-                all_docs = fetch_documents(
-                    url,
-                    limit=limit,
-                    doc_prefix=doc_prefix,
-                    lang=lang,
-                    title_prefix=title_prefix,
-                )
+                # 1) Fetch from RSS (conditional: send stored ETag /
+                # Last-Modified so unchanged feeds answer 304 and skip the
+                # whole parse+ingest pipeline).
+                # requests.get is blocking; run it in a thread so the event
+                # loop (and other due sources) are not stalled on slow feeds.
+                try:
+                    all_docs, fs.etag, fs.last_modified = await asyncio.to_thread(
+                        fetch_feed,
+                        url,
+                        limit=limit,
+                        doc_prefix=doc_prefix,
+                        lang=lang,
+                        title_prefix=title_prefix,
+                        etag=fs.etag,
+                        last_modified=fs.last_modified,
+                    )
+                except FeedNotModified:
+                    not_modified = True
+                    all_docs = []
                 fetched_n = len(all_docs)
 
                 # 2) Deduplicate using state.seen_ids
@@ -289,8 +309,10 @@ async def scheduler_loop(
                 ingested_n = await asyncio.to_thread(store.add_documents, new_docs, persist=True)
 
                 # 4) Update index for new docs
+                # Tokenization + persist are CPU/disk bound; keep them off
+                # the event loop as well.
                 if ingested_n > 0:
-                    update_index(new_docs, index)
+                    await asyncio.to_thread(update_index, new_docs, index)
 
                 add_ids = [d.doc_id for d in new_docs]
 
@@ -301,7 +323,7 @@ async def scheduler_loop(
 
                 print(
                     f"[scheduler] source={src_id} fetched={fetched_n} "
-                    f"new={new_n} ingested={ingested_n}"
+                    f"new={new_n} ingested={ingested_n} not_modified={not_modified}"
                 )
 
             except Exception as e:
@@ -324,6 +346,7 @@ async def scheduler_loop(
                 "url": url,
                 "ok": ok,
                 "err": err,
+                "not_modified": not_modified,
                 "interval_s": interval_s,
                 "limit": limit,
                 "fetched": fetched_n,
@@ -335,15 +358,20 @@ async def scheduler_loop(
                 "duration_ms": dur_ms,
             })
 
-            # Persist merged state:
-            # - add_ids -> seen_ids union
-            # - update feeds[src_id]
-            # - update last_run_iso
-            # state only keep latest, and write back via update_state
+            # Queue this source's updates for the end-of-tick batched save.
+            pending_add_ids.extend(add_ids)
+            pending_feeds[src_id] = fs
+
+        # Persist merged state once per tick (debounced):
+        # - pending_add_ids -> seen_ids union
+        # - update feeds for every source processed this tick
+        # - update last_run_iso
+        # update_state() still locks and writes atomically.
+        if pending_add_ids or pending_feeds:
             state = update_state(
                 state_path,
-                add_doc_ids=add_ids,
-                feed_updates={src_id: fs},
+                add_doc_ids=pending_add_ids,
+                feed_updates=pending_feeds,
                 touch_last_run=True,
             )
 
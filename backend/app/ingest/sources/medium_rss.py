@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import hashlib
 from datetime import timezone
 
@@ -8,6 +8,13 @@ import feedparser
 from dateutil import parser as dtparser
 from bs4 import BeautifulSoup
 
+# selectolax (Lexbor, C) is ~10-30x faster than bs4's html.parser on long
+# Medium bodies; fall back to BeautifulSoup where it is not installed.
+try:
+    from selectolax.parser import HTMLParser
+except Exception:  # pragma: no cover
+    HTMLParser = None
+
 from ...schemas import Document
 from ..backfill_cc.doc_id import make_global_doc_id
 
@@ -29,28 +36,51 @@ def _to_iso8601(raw_time: Optional[str]) -> Optional[str]:
     return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
 
 def _html_to_text(html: str) -> str:
+    if HTMLParser is not None:
+        return HTMLParser(html or "").text(separator=" ", strip=True)
     soup = BeautifulSoup(html or "", "html.parser")
     return soup.get_text(separator=" ", strip=True)
 
 
-def fetch_documents(
+class FeedNotModified(Exception):
+    """Raised when a conditional fetch gets HTTP 304 (feed unchanged)."""
+
+
+def fetch_feed(
     feed_url: str,
     limit: int = 10,
     timeout_s: int = 15,
     doc_prefix: str = "md",
     lang: str = "en",
     title_prefix: str = "",
-) -> List[Document]:
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Tuple[List[Document], Optional[str], Optional[str]]:
     """
-    Fetch RSS and map to List[Document].
+    Fetch RSS and map to List[Document], with conditional-HTTP support.
+
+    When `etag` / `last_modified` from a previous poll are supplied they are
+    sent as If-None-Match / If-Modified-Since; a 304 answer raises
+    FeedNotModified so the caller can skip the whole parse+ingest pipeline.
+
+    Returns (docs, etag, last_modified) as seen on this response, for the
+    caller to persist for the next poll.
 
     This function is intentionally generic (works for Medium, arXiv, BBC, HN, TechCrunch, MIT, ...).
     """
+    headers = {"User-Agent": "ttds-cw3-ingest/1.0"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
     resp = requests.get(
         feed_url,
         timeout=timeout_s,
-        headers={"User-Agent": "ttds-cw3-ingest/1.0"},
+        headers=headers,
     )
+    if resp.status_code == 304:
+        raise FeedNotModified(feed_url)
     resp.raise_for_status()
     feed = feedparser.parse(resp.text)
 
@@ -85,4 +115,24 @@ def fetch_documents(
             )
         )
 
+    return docs, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+
+
+def fetch_documents(
+    feed_url: str,
+    limit: int = 10,
+    timeout_s: int = 15,
+    doc_prefix: str = "md",
+    lang: str = "en",
+    title_prefix: str = "",
+) -> List[Document]:
+    """Unconditional fetch; kept for callers without per-feed cache state."""
+    docs, _, _ = fetch_feed(
+        feed_url,
+        limit=limit,
+        timeout_s=timeout_s,
+        doc_prefix=doc_prefix,
+        lang=lang,
+        title_prefix=title_prefix,
+    )
     return docs
@@ -16,9 +16,10 @@ Persist minimal state between runs so that:
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
-import json
 from typing import Set, Optional, Dict, Any
 
+from ..utils import jsonio
+
 """
 ---------------------------------------------------------------------------
 FeedState
@@ -114,7 +115,7 @@ class IngestState:
         if not path.exists():
             return IngestState(seen_ids=set(), last_run_iso=None, feeds={})
 
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = jsonio.loads(path.read_bytes())
 
         feeds_raw = data.get("feeds", {}) or {}
         feeds = {
@@ -135,13 +136,15 @@ class IngestState:
 
         What does it do:
         - Ensures parent directory exists
-        - Sorts seen_ids for stable output
         - Serializes FeedState objects
+
+        seen_ids are written in set-iteration order: sorting them was
+        O(N log N) on every save and the loader rebuilds a set anyway.
         """
         path.parent.mkdir(parents=True, exist_ok=True)
 
         payload = {
-            "seen_ids": sorted(list(self.seen_ids)),
+            "seen_ids": list(self.seen_ids),
             "last_run_iso": self.last_run_iso,
             "feeds": {
                 k: v.to_dict()
@@ -149,8 +152,5 @@ class IngestState:
             },
         }
 
-        path.write_text(
-            json.dumps(payload, ensure_ascii=False, indent=2),
-            encoding="utf-8"
-        )
+        path.write_bytes(jsonio.dumps_indent2(payload))
 
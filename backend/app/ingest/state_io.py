@@ -14,12 +14,13 @@ What it helps
 # backend/app/ingest/state_io.py
 from __future__ import annotations
 
-import json, os, tempfile
+import os, tempfile
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Iterable, Optional, Dict, Any
 
 from .state import IngestState, FeedState
+from ..utils import jsonio
 from .time_utils import now_iso  # 或者把 now_iso 挪到公共 util
 
 import time
@@ -61,9 +62,9 @@ Prevents partial file corruption:
 2) Atomically replace the target file
 ---------------------------------------------------------------------------
 """
-def atomic_write_json(path: Path, payload: Dict[str, Any], *, indent: int = 2) -> None:
+def atomic_write_json(path: Path, payload: Dict[str, Any]) -> None:
     """
-    Atomically write JSON to disk.
+    Atomically write JSON to disk (2-space indent, orjson when available).
 
     Guarantees:
     - File is either fully written or not changed at all.
@@ -72,8 +73,8 @@ def atomic_write_json(path: Path, payload: Dict[str, Any], *, indent: int = 2) -
     path.parent.mkdir(parents=True, exist_ok=True)
     fd, tmp = tempfile.mkstemp(prefix=path.name + ".", dir=str(path.parent))
     try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=indent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(jsonio.dumps_indent2(payload))
         os.replace(tmp, path) # atomic replacement
     finally:
         try:
@@ -101,7 +102,9 @@ def state_to_payload(state: IngestState) -> Dict[str, Any]:
             feeds_out[k] = getattr(v, "to_dict", lambda: {})()
 
     return {
-        "seen_ids": sorted(list(state.seen_ids)),
+        # No sort: order is irrelevant for the loader (it builds a set) and
+        # sorting cost O(N log N) per scheduler save.
+        "seen_ids": list(state.seen_ids),
         "last_run_iso": getattr(state, "last_run_iso", None),
         "feeds": feeds_out,
     }
@@ -137,12 +140,7 @@ def update_state_seen_ids(
             latest.last_run_iso = now_iso()
 
         payload = state_to_payload(latest)
-
-        # make sure seen_ids is a list and saved in multiple lines (readable)
-        if isinstance(payload.get("seen_ids"), set):
-            payload["seen_ids"] = sorted(list(payload["seen_ids"]))
-
-        atomic_write_json(state_path, payload, indent=2)
+        atomic_write_json(state_path, payload)
         return latest
     
 
@@ -201,7 +199,7 @@ def update_state(
             latest.last_run_iso = now_iso()
 
         t2 = time.time()
-        atomic_write_json(state_path, state_to_payload(latest), indent=2)
+        atomic_write_json(state_path, state_to_payload(latest))
         t3 = time.time()
 
         if t3 - t2 > 0.5:
@@ -1,4 +1,8 @@
 from __future__ import annotations
+import asyncio
+import threading
+
+from cachetools import TTLCache
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -7,6 +11,7 @@ from .storage.document_store import DocumentStore
 from .storage.index_store import IndexStore
 from .indexing.indexer import build_index, update_index
 from .search.searcher import search as run_search
+from .search._bm25_kernel import warmup as warm_bm25_kernel
 from .features.prf import expand_query
 from .utils.logging import get_logger
 from .ingest.scheduler import start_scheduler_task
@@ -29,6 +34,26 @@ STORE = DocumentStore()
 INDEX = IndexStore()
 SCHEDULER_TASK = None
 
+# Search traffic is Zipfian: a few queries dominate. Cache whole responses
+# for a short TTL; index_version is part of the key, so every ingest
+# implicitly invalidates all cached entries.
+_SEARCH_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=60)
+_SEARCH_CACHE_LOCK = threading.Lock()
+
+
+def _search_cache_key(req: SearchRequest) -> tuple:
+    f = req.filters
+    filters_key = (f.lang, f.time_from, f.time_to, f.field, f.sort) if f else None
+    return (
+        req.query.strip().lower(),
+        req.top_k,
+        req.use_prf,
+        filters_key,
+        req.last_min_bm25_score,
+        req.last_max_rerank_id,
+        INDEX.index_version,
+    )
+
 def _load_or_seed():
     STORE.load_if_exists()
     INDEX.load_if_exists()
@@ -73,6 +98,8 @@ def _load_or_seed():
         logger.info("Seeded demo documents and built index.")
 
 _load_or_seed()
+# Compile the optional numba scoring kernel now, not on the first query.
+warm_bm25_kernel()
 
 
 # Open scheduler
@@ -95,17 +122,31 @@ def health():
     return HealthResponse(status="ok", index_version=INDEX.index_version, docs_count=len(STORE))
 
 @app.post("/search", response_model=SearchResponse)
-def search(req: SearchRequest):
+async def search(req: SearchRequest):
+    key = _search_cache_key(req)
+    with _SEARCH_CACHE_LOCK:
+        cached = _SEARCH_CACHE.get(key)
+    if cached is not None:
+        # Report the hit's own (sub-ms) latency, not the latency of the
+        # query that originally populated the cache entry.
+        return cached.model_copy(update={"took_ms": 0})
+
     # PRF hook is optional; keep it simple for demo
-    return run_search(req, STORE, INDEX, prf_expand=expand_query)
+    # Scoring is CPU-bound: run it off the event loop so concurrent
+    # requests are not serialized behind one query.
+    resp = await asyncio.to_thread(run_search, req, STORE, INDEX, expand_query)
+
+    with _SEARCH_CACHE_LOCK:
+        _SEARCH_CACHE[key] = resp
+    return resp
 
 @app.post("/admin/ingest", response_model=IngestResponse)
-def ingest(req: IngestRequest):
-    ingested = STORE.add_documents(req.docs, persist=True)
+async def ingest(req: IngestRequest):
+    ingested = await asyncio.to_thread(STORE.add_documents, req.docs, True)
     if ingested > 0:
         # update index only for the newly added docs
         # (we filter again inside update_index anyway)
-        index_version = update_index(req.docs, INDEX)
+        index_version = await asyncio.to_thread(update_index, req.docs, INDEX)
         updated = True
     else:
         index_version = INDEX.index_version
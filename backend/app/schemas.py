@@ -1,8 +1,20 @@
 from __future__ import annotations
+import datetime
+from functools import cached_property
 from typing import Optional, List, Dict, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
-class Document(BaseModel):
+
+class APIModel(BaseModel):
+    """所有 DTO 的基类：固定 pydantic v2 (rust core) 的快速校验配置。
+
+    extra='ignore' 丢弃未知字段而不是报错/保留，validate_assignment 关闭
+    （DTO 构造后不再改字段）。/admin/ingest 的大 docs 列表受益最大。
+    """
+    model_config = ConfigDict(extra="ignore", validate_assignment=False)
+
+
+class Document(APIModel):
     doc_id: str
     title: str
     body: str
@@ -10,14 +22,48 @@ class Document(BaseModel):
     timestamp: Optional[str] = None  # ISO string
     lang: str = "en"
 
-class SearchFilters(BaseModel):
+    @cached_property
+    def ts_epoch(self) -> Optional[float]:
+        """timestamp 解析成 epoch 秒，首次访问时解析并缓存。
+
+        时间过滤和新鲜度加权原来每次查询都对候选文档重跑 fromisoformat，
+        缓存成一个 float 之后只剩数值比较。缺失/非法时间戳返回 None。
+        """
+        if not self.timestamp:
+            return None
+        try:
+            return datetime.datetime.fromisoformat(
+                self.timestamp.replace("Z", "+00:00")).timestamp()
+        except Exception:
+            return None
+
+    @cached_property
+    def body_lower(self) -> str:
+        """正文的小写副本，首次访问时构建并缓存。
+
+        摘要定位按查询重复扫描正文，长文档每次 .lower() 一遍很浪费；
+        文档在 store 里常驻，缓存一份随文档复用（不参与序列化）。
+        """
+        return self.body.lower()
+
+    def __getstate__(self):
+        # 序列化前剔除懒缓存的派生值：body_lower 是正文的完整副本，
+        # 留着会让 docs.pkl 体积近乎翻倍。加载后首次访问时重建。
+        state = super().__getstate__()
+        inst = state.get("__dict__")
+        if inst and ("body_lower" in inst or "ts_epoch" in inst):
+            state["__dict__"] = {k: v for k, v in inst.items()
+                                 if k not in ("body_lower", "ts_epoch")}
+        return state
+
+class SearchFilters(APIModel):
     lang: Optional[str] = None
     time_from: Optional[str] = None  # ISO
     time_to: Optional[str] = None    # ISO
     field: Optional[Literal["title", "body"]] = None
     sort: Optional[Literal["relevance", "freshness"]] = "relevance"
 
-class SearchRequest(BaseModel):
+class SearchRequest(APIModel):
     query: str = Field(..., min_length=1)
     top_k: int = 10
     use_prf: bool = False
@@ -32,7 +78,7 @@ class SearchRequest(BaseModel):
         description="上次搜索结果中统一重排序后序号最大的文档ID"
     )
 
-class SearchResult(BaseModel):
+class SearchResult(APIModel):
     doc_id: str
     title: str
     snippet: str
@@ -41,21 +87,21 @@ class SearchResult(BaseModel):
     timestamp: Optional[str] = None
     lang: str = "en"
 
-class SearchResponse(BaseModel):
+class SearchResponse(APIModel):
     query: str
     took_ms: int
     total_hits: int
     results: List[SearchResult]
 
-class IngestRequest(BaseModel):
+class IngestRequest(APIModel):
     docs: List[Document]
 
-class IngestResponse(BaseModel):
+class IngestResponse(APIModel):
     ingested: int
     updated_index: bool
     index_version: str
 
-class HealthResponse(BaseModel):
+class HealthResponse(APIModel):
     status: str
     index_version: str
     docs_count: int
@@ -1,134 +1,304 @@
 from __future__ import annotations
-from typing import Dict, List, Tuple, Optional, Set
-import math
+from typing import Dict, List, Tuple, Optional, Set, Union
+
+import numpy as np
 
 from ..storage.index_store import IndexStore
+from ._bm25_kernel import score_packed
+
+
+def _score_vector(query_terms: List[str],
+                  index: IndexStore,
+                  target_docs: Optional[Union[Set[int], np.ndarray]],
+                  k1: float,
+                  b: float,
+                  top_k: Optional[int]) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """
+    共用的BM25打分内核。
+
+    返回 (scores_vec, tgt)：scores_vec 是按内部 id 索引的 float32 分数向量，
+    tgt 是 target_docs 对应的 id 数组（全量路径为 None）。没有任何可打分的
+    词项/文档时返回 None。
+    """
+    if not query_terms:
+        return None
+
+    # Corpus stats are O(1) reads: total_dl is maintained incrementally at
+    # index time, so no per-query pass over doc_len.
+    avgdl = index.avgdl or 1.0
+
+    # Per-term IDF comes from the IndexStore cache (computed once per term
+    # per index version; the +1 smoothing lives there too).
+    term_idf: Dict[str, float] = {}
+    seen_terms = set(query_terms)
+
+    for term in seen_terms:
+        idf = index.idf(term)
+        if idf is not None:
+            term_idf[term] = idf
+
+    doc_len_arr = index.doc_len_array()
+    if doc_len_arr.size == 0 or not term_idf:
+        return None
+
+    # 分数累加到按内部 id 索引的稠密向量里，整条 posting list 一次算完
+    scores_vec = np.zeros(doc_len_arr.shape[0], dtype=np.float32)
+
+    # 如果没有指定目标文档，则计算所有文档
+    if target_docs is None:
+        # 全量扫描且不剪枝时走 Numba 内核：所有词项的 posting 拼成连续
+        # 缓冲后在一个编译循环（不持 GIL）里打分，省掉每词项的 NumPy 分发。
+        # 查询内的多核并行由内核的 prange 负责，查询间的并行由
+        # asyncio.to_thread 负责（nogil 编译代码不会互相阻塞），
+        # 不需要再手工把 posting 分片丢线程池——合并分片的开销反而更大
+        if score_packed is not None and top_k is None:
+            arrs = [index.postings_arrays(term) for term in term_idf]
+            idfs = np.fromiter(term_idf.values(), dtype=np.float32,
+                               count=len(term_idf))
+            sizes = [a[0].size for a in arrs]
+            offsets = np.concatenate(([0], np.cumsum(sizes))).astype(np.int64)
+            did_buf = np.concatenate([a[0] for a in arrs])
+            tf_buf = np.concatenate([a[1] for a in arrs])
+            score_packed(idfs, offsets, did_buf, tf_buf, doc_len_arr,
+                         k1, b, avgdl, scores_vec)
+            return scores_vec, None
+
+        # MaxScore：单词项对任意文档的贡献上界是 idf*(k1+1)（tf 饱和极限）。
+        # 按上界从大到小处理词项；一旦当前第k名的部分分数已经不低于
+        # 剩余词项的上界之和，剩余（非必需）词项就不可能把新文档推进前k，
+        # 只需更新已有候选的分数。
+        prune = top_k is not None and 0 < top_k < doc_len_arr.shape[0] and len(term_idf) > 1
+        order = sorted(term_idf.items(), key=lambda kv: kv[1], reverse=True)
+        remaining = sum(idf for _, idf in order) * (k1 + 1.0)
+        kth_score = None
+
+        for term, idf in order:
+            # 逐文档贡献在索引版本内是常量，直接用缓存向量（零算术）
+            doc_ids, contrib = index.contrib_arrays(term, k1, b)
+
+            # 剪枝判定要用"含当前词项"的上界（此时 remaining 尚未扣除
+            # 当前词项）：新文档错过了前面所有词项，它的终分上界是当前
+            # 词项加上其后所有词项的上界之和。先扣再比会把当前词项自身
+            # 的贡献漏掉——低 idf 高 tf 的词项命中的文档会被整批错剪。
+            if prune and kth_score is not None and kth_score >= remaining:
+                cand = scores_vec[doc_ids] > 0
+                if not cand.any():
+                    remaining -= idf * (k1 + 1.0)
+                    continue
+                doc_ids = doc_ids[cand]
+                contrib = contrib[cand]
+
+            remaining -= idf * (k1 + 1.0)
+
+            # 同一条 posting list 内 doc_id 不重复，fancy-index 的 += 是安全的
+            scores_vec[doc_ids] += contrib
+
+            # 部分分数只增不减，第k大的部分分数是最终第k名分数的下界
+            if prune and (kth_score is None or kth_score < remaining):
+                if np.count_nonzero(scores_vec) >= top_k:
+                    cut = scores_vec.size - top_k
+                    kth_score = float(np.partition(scores_vec, cut)[cut])
+
+        return scores_vec, None
+
+    # 如果指定了目标文档，只计算这些文档的分数
+    else:
+        if len(target_docs) == 0:
+            return None
+
+        # parse_query 给的是有序 int32 数组；也兼容普通集合
+        if isinstance(target_docs, np.ndarray):
+            tgt = target_docs.astype(np.int64)
+        else:
+            tgt = np.fromiter(target_docs, dtype=np.int64, count=len(target_docs))
+
+        for term in term_idf:
+            # 贡献向量按 (term, k1, b) 缓存，这里只做 isin 掩码 + 累加
+            doc_ids, contrib = index.contrib_arrays(term, k1, b)
+            # 两边都不含重复 id（posting list / 集合），assume_unique 走快路径
+            mask = np.isin(doc_ids, tgt, assume_unique=True)
+            if not mask.any():
+                continue
+            scores_vec[doc_ids[mask]] += contrib[mask]
+
+        return scores_vec, tgt
 
 
 def bm25_scores(query_terms: List[str],
                 index: IndexStore,
-                target_docs: Optional[Set[str]] = None,
+                target_docs: Optional[Union[Set[int], np.ndarray]] = None,
                 k1: float = 1.2,
-                b: float = 0.75) -> Dict[str, float]:
+                b: float = 0.75,
+                top_k: Optional[int] = None) -> Dict[int, float]:
     """
-        计算BM25分数
+        计算BM25分数（NumPy 向量化，单项贡献是数组级的逐元素算术）
 
         Args:
             query_terms: 查询词项列表
             index: 索引存储
-            target_docs: 可选，要计算分数的文档ID集合。如果为None，则计算所有文档
+            target_docs: 可选，要计算分数的内部文档ID集合。如果为None，则计算所有文档
             k1: BM25参数k1
             b: BM25参数b
+            top_k: 可选，调用方只需要前k名时启用 MaxScore 剪枝
+                   （只影响全量路径；返回值仍是完整的命中映射，
+                    但被剪掉的文档只带部分分数、不会进入前k名）
 
         Returns:
-            文档ID到分数的映射。如果指定了target_docs，则只返回target_docs中的文档分数
+            内部文档ID到分数的映射。如果指定了target_docs，则只返回target_docs中的文档分数
     """
-    if not query_terms:
+    res = _score_vector(query_terms, index, target_docs, k1, b, top_k)
+    if res is None:
         return {}
+    scores_vec, tgt = res
 
-    # Compute BM25 over in-memory postings
-    N = max(1, len(index.doc_len))
-    avgdl = sum(index.doc_len.values()) / N
+    if tgt is None:
+        hits = np.nonzero(scores_vec)[0]
+        # tolist() 一次性转 Python 标量，比逐元素 int()/float() 索引快
+        return dict(zip(hits.tolist(), scores_vec[hits].tolist()))
 
-    # Precompute document frequencies
-    term_idf: Dict[str, float] = {}
-    seen_terms = set(query_terms)
-
-    for term in seen_terms:
-        postings = index.postings.get(term, [])
-        df = len(postings)
-        if df == 0:
-            continue
-        # IDF with +1 to avoid negative for very frequent terms in tiny demo
-        idf = math.log(1 + (N - df + 0.5) / (df + 0.5))
-        term_idf[term] = idf
+    sel = scores_vec[tgt]
+    return {int(doc_id): float(score)
+            for doc_id, score in zip(tgt.tolist(), sel.tolist())
+            if score > 0}
 
-        # 如果没有指定目标文档，则计算所有文档
-    if target_docs is None:
-        scores: Dict[str, float] = {}
 
-        for term, idf in term_idf.items():
-            for doc_id, tf in index.postings.get(term, []):
-                dl = index.doc_len.get(doc_id, 0) or 1
-                denom = tf + k1 * (1 - b + b * (dl / avgdl))
-                score = idf * (tf * (k1 + 1) / denom)
-                scores[doc_id] = scores.get(doc_id, 0.0) + score
+def bm25_top_k(query_terms: List[str],
+               index: IndexStore,
+               top_k: int,
+               target_docs: Optional[Union[Set[int], np.ndarray]] = None,
+               k1: float = 1.2,
+               b: float = 0.75) -> List[Tuple[int, float]]:
+    """
+    只取前k名的BM25接口，返回 [(内部文档ID, 分数), ...]（分数降序）。
 
-        return scores
+    不物化全量 {doc_id: score} 字典：argpartition 先做 O(n) 的前k切分，
+    再只对k个元素排序。全量路径自动启用 MaxScore 剪枝。
+    """
+    res = _score_vector(query_terms, index, target_docs, k1, b, top_k)
+    if res is None:
+        return []
+    scores_vec, tgt = res
 
-    # 如果指定了目标文档，只计算这些文档的分数
+    if tgt is None:
+        cand_ids = np.nonzero(scores_vec)[0]
+        cand_scores = scores_vec[cand_ids]
     else:
-        if not target_docs:
-            return {}
+        cand_scores = scores_vec[tgt]
+        hit = cand_scores > 0
+        cand_ids = tgt[hit]
+        cand_scores = cand_scores[hit]
 
-        scores: Dict[str, float] = {}
+    if cand_ids.size > top_k:
+        part = np.argpartition(-cand_scores, top_k)[:top_k]
+        cand_ids = cand_ids[part]
+        cand_scores = cand_scores[part]
 
-        # 为了优化性能，先为每个词项建立文档到TF的映射
-        term_doc_tf: Dict[str, Dict[str, int]] = {}
-        for term, idf in term_idf.items():
-            doc_tf_map = {}
-            for doc_id, tf in index.postings.get(term, []):
-                if doc_id in target_docs:
-                    doc_tf_map[doc_id] = tf
-            if doc_tf_map:
-                term_doc_tf[term] = doc_tf_map
+    order = np.argsort(-cand_scores)
+    return [(int(doc_id), float(score))
+            for doc_id, score in zip(cand_ids[order].tolist(),
+                                     cand_scores[order].tolist())]
 
-        # 计算每个目标文档的分数
-        for doc_id in target_docs:
-            score = 0.0
-            dl = index.doc_len.get(doc_id, 0) or 1
 
-            for term, idf in term_idf.items():
-                # 检查该文档是否包含该词项
-                if term in term_doc_tf and doc_id in term_doc_tf[term]:
-                    tf = term_doc_tf[term][doc_id]
-                    denom = tf + k1 * (1 - b + b * (dl / avgdl))
-                    score += idf * (tf * (k1 + 1) / denom)
+def bm25_scores_batch(queries: List[List[str]],
+                      index: IndexStore,
+                      k1: float = 1.2,
+                      b: float = 0.75) -> List[Dict[int, float]]:
+    """
+    批量BM25：同一索引上一次调用评多条查询（PRF 的两趟检索、离线评测）。
 
-            if score > 0:  # 只记录有分数的文档
-                scores[doc_id] = score
+    同一个词项往往出现在多条查询里（PRF 扩展查询包含原查询的全部词项），
+    它的逐文档贡献向量只算一次，再散射进每条用到它的查询的分数行；
+    相比逐条调用 bm25_scores，省掉重复的 posting 级算术。
+    """
+    if not queries:
+        return []
 
-        return scores
+    avgdl = index.avgdl or 1.0
+    doc_len_arr = index.doc_len_array()
+    if doc_len_arr.size == 0:
+        return [{} for _ in queries]
+
+    # term -> 用到它的查询下标
+    term_queries: Dict[str, List[int]] = {}
+    for qi, terms in enumerate(queries):
+        for term in set(terms):
+            term_queries.setdefault(term, []).append(qi)
+
+    scores = np.zeros((len(queries), doc_len_arr.shape[0]), dtype=np.float32)
+
+    for term, qidxs in term_queries.items():
+        idf = index.idf(term)
+        if idf is None:
+            continue
+        doc_ids, tfs = index.postings_arrays(term)
+        dl = doc_len_arr[doc_ids]
+        denom = tfs + k1 * (1.0 - b + b * (dl / avgdl))
+        contrib = idf * (tfs * (k1 + 1.0)) / denom
+        for qi in qidxs:
+            scores[qi, doc_ids] += contrib
+
+    out: List[Dict[int, float]] = []
+    for qi in range(len(queries)):
+        row = scores[qi]
+        hits = np.nonzero(row)[0]
+        out.append(dict(zip(hits.tolist(), row[hits].tolist())))
+    return out
+
+
+def bm25_single_term_scores(term: str,
+                            index: IndexStore,
+                            k1: float = 1.2,
+                            b: float = 0.75) -> Dict[int, float]:
+    """
+    单词项查询的BM25快路径，返回 {内部文档ID: 分数}。
+
+    单词项时每个命中文档的最终分数就是该词的预计算贡献值本身：
+    不需要分数向量、isin 掩码、MaxScore，更不需要语法树求值，
+    直接把缓存的 (doc_ids, contrib) 拉成字典。
+    """
+    entry = index.contrib_arrays(term, k1, b)
+    if entry is None:
+        return {}
+    doc_ids, contrib = entry
+    return dict(zip(doc_ids.tolist(), contrib.tolist()))
 
 
 def bm25_score_single_doc(query_terms: List[str], index: IndexStore,
-                          doc_id: str, k1: float = 1.2, b: float = 0.75) -> float:
+                          doc_id: int, k1: float = 1.2, b: float = 0.75) -> float:
     """
     计算单个文档的BM25分数
 
     Args:
         query_terms: 查询词项列表
         index: 索引存储
-        doc_id: 文档ID
+        doc_id: 内部文档ID
         k1: BM25参数k1
         b: BM25参数b
 
     Returns:
         文档的BM25分数
     """
-    N = max(1, len(index.doc_len))
-    avgdl = sum(index.doc_len.values()) / N
+    avgdl = index.avgdl or 1.0
 
     score = 0.0
     seen_terms = set(query_terms)
     dl = index.doc_len.get(doc_id, 0) or 1
 
     for term in seen_terms:
-        postings = index.postings.get(term, [])
-        if not postings:
+        arrs = index.postings_arrays(term)
+        if arrs is None:
+            continue
+
+        # posting list 按内部 id 升序（索引时按 id 顺序追加），
+        # 二分查找该文档，不再 O(df) 线性扫
+        doc_ids, tfs = arrs
+        idx = int(np.searchsorted(doc_ids, doc_id))
+        if idx >= doc_ids.size or int(doc_ids[idx]) != doc_id:
             continue
 
-        # 检查该文档是否包含该词项
-        tf = 0
-        for pid, term_tf in postings:
-            if pid == doc_id:
-                tf = term_tf
-                break
-
-        if tf > 0:
-            df = len(postings)
-            idf = math.log(1 + (N - df + 0.5) / (df + 0.5))
-            denom = tf + k1 * (1 - b + b * (dl / avgdl))
-            score += idf * (tf * (k1 + 1) / denom)
+        tf = float(tfs[idx])
+        idf = index.idf(term) or 0.0
+        denom = tf + k1 * (1 - b + b * (dl / avgdl))
+        score += idf * (tf * (k1 + 1) / denom)
 
     return score
@@ -1,10 +1,13 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, List, Set, Union, Optional, Tuple
+import bisect
 import re
 import math
 import logging
 
+import numpy as np
+
 from ..storage.index_store import IndexStore
 from ..indexing.tokenizer import tokenize_en
 
@@ -12,14 +15,40 @@ from ..indexing.tokenizer import tokenize_en
 logger = logging.getLogger(__name__)
 
 
+# 查询 token 模式，模块加载时合并编译一次（每次查询重新编译要花几百微秒）
+_TOKEN_PATTERNS = [
+    ('PROXIMITY', r'#(\d+)\(([^,]+),([^)]+)\)'),
+    ('PHRASE', r'"([^"]+)"'),
+    ('NOT', r'\bNOT\b'),
+    ('AND', r'\bAND\b'),
+    ('OR', r'\bOR\b'),
+    ('LPAREN', r'\('),
+    ('RPAREN', r'\)'),
+    ('TERM', r'[^\s()"]+'),
+]
+_COMBINED_RE = re.compile(
+    '|'.join(f'(?P<{name}>{regex})' for name, regex in _TOKEN_PATTERNS),
+    re.IGNORECASE,
+)
+
+# 布尔求值统一用"有序去重的 np.int32 数组"表示结果集：
+# posting 的 doc_id 数组本身就满足这个不变式，交并差走
+# np.intersect1d / union1d / setdiff1d 的 C 归并，不再物化 Python set
+_EMPTY_IDS = np.empty(0, dtype=np.int32)
+
+
 @dataclass
 class QueryNode:
     """查询语法树节点基类"""
 
-    def evaluate(self, index: IndexStore) -> Set[str]:
-        """评估节点，返回匹配的文档集合"""
+    def evaluate(self, index: IndexStore) -> np.ndarray:
+        """评估节点，返回匹配的内部文档 id（有序去重的 np.int32 数组）"""
         raise NotImplementedError
 
+    def estimated_size(self, index: IndexStore) -> int:
+        """估计结果集大小（用 df 做代理，AND 据此决定求值顺序）"""
+        return len(index.doc_len)
+
     def to_string(self, parent_precedence: int = 0) -> str:
         """将节点转换为字符串表示"""
         raise NotImplementedError
@@ -33,11 +62,16 @@ class TermNode(QueryNode):
     """词项节点"""
     term: str
 
-    def evaluate(self, index: IndexStore) -> Set[str]:
+    def evaluate(self, index: IndexStore) -> np.ndarray:
         """评估词项节点"""
-        if self.term in index.postings:
-            return set(doc_id for doc_id, _ in index.postings[self.term])
-        return set()
+        # posting 的 doc_id 数组天然有序去重，直接复用缓存的 NumPy 视图，
+        # 零拷贝零构建（交并差都不会原地修改它）
+        arrs = index.postings_arrays(self.term)
+        return arrs[0] if arrs is not None else _EMPTY_IDS
+
+    def estimated_size(self, index: IndexStore) -> int:
+        entry = index.postings.get(self.term)
+        return len(entry[0]) if entry is not None else 0
 
     def to_string(self, parent_precedence: int = 0) -> str:
         return self.term
@@ -48,57 +82,71 @@ class PhraseNode(QueryNode):
     """短语节点"""
     terms: List[str]
 
-    def evaluate(self, index: IndexStore) -> Set[str]:
+    def evaluate(self, index: IndexStore) -> np.ndarray:
         """评估短语节点"""
         if not self.terms:
-            return set()
+            return _EMPTY_IDS
 
         # 获取包含第一个词的所有文档作为候选
-        first_term = self.terms[0]
-        if first_term not in index.postings:
-            return set()
+        first_arrs = index.postings_arrays(self.terms[0])
+        if first_arrs is None:
+            return _EMPTY_IDS
 
         # 如果没有位置信息，退化为AND查询
         if not hasattr(index, 'positions') or not index.positions:
-            result = set(doc_id for doc_id, _ in index.postings.get(first_term, []))
+            result = first_arrs[0]
             for term in self.terms[1:]:
-                if term not in index.postings:
-                    return set()
-                term_docs = set(doc_id for doc_id, _ in index.postings[term])
-                result &= term_docs
+                arrs = index.postings_arrays(term)
+                if arrs is None:
+                    return _EMPTY_IDS
+                result = np.intersect1d(result, arrs[0], assume_unique=True)
             return result
 
         # 使用位置信息进行精确短语匹配
-        candidate_docs = set(doc_id for doc_id, _ in index.postings.get(first_term, []))
-        result_docs = set()
-
-        for doc_id in candidate_docs:
-            positions_lists = []
-            valid = True
-
-            for term in self.terms:
-                if doc_id not in index.positions.get(term, {}):
-                    valid = False
-                    break
-                positions = sorted(index.positions[term][doc_id])
-                positions_lists.append(positions)
-
-            if not valid:
+        # 先对所有短语词的 posting 求交：候选文档必须包含每个词
+        candidate_docs = first_arrs[0]
+        for term in self.terms[1:]:
+            arrs = index.postings_arrays(term)
+            if arrs is None:
+                return _EMPTY_IDS
+            candidate_docs = np.intersect1d(candidate_docs, arrs[0],
+                                            assume_unique=True)
+            if candidate_docs.size == 0:
+                return _EMPTY_IDS
+
+        positions_by_term = [index.positions.get(term, {}) for term in self.terms]
+        result_docs: List[int] = []
+
+        # intersect1d 的结果有序，按序追加即可保持不变式
+        for doc_id in candidate_docs.tolist():
+            positions_lists = [by_doc.get(doc_id) for by_doc in positions_by_term]
+            if any(plist is None for plist in positions_lists):
                 continue
 
-            # 检查是否存在连续位置序列
+            # 位置数组索引时按 enumerate 顺序追加，天然有序：
+            # 连续位置检查用二分（bisect 是 C 实现），不再线性 `in` 扫描
             for start_pos in positions_lists[0]:
                 match = True
                 for i in range(1, len(self.terms)):
+                    plist = positions_lists[i]
                     expected_pos = start_pos + i
-                    if expected_pos not in positions_lists[i]:
+                    k = bisect.bisect_left(plist, expected_pos)
+                    if k >= len(plist) or plist[k] != expected_pos:
                         match = False
                         break
                 if match:
-                    result_docs.add(doc_id)
+                    result_docs.append(doc_id)
                     break
 
-        return result_docs
+        return np.array(result_docs, dtype=np.int32)
+
+    def estimated_size(self, index: IndexStore) -> int:
+        # 短语结果不会超过其中最稀有词的 df
+        sizes = []
+        for term in self.terms:
+            entry = index.postings.get(term)
+            sizes.append(len(entry[0]) if entry is not None else 0)
+        return min(sizes) if sizes else 0
 
     def to_string(self, parent_precedence: int = 0) -> str:
         return f'"{" ".join(self.terms)}"'
@@ -111,48 +159,55 @@ class ProximityNode(QueryNode):
     term2: str
     distance: int
 
-    def evaluate(self, index: IndexStore) -> Set[str]:
+    def evaluate(self, index: IndexStore) -> np.ndarray:
         """评估邻近查询节点"""
         # 如果没有位置信息，退化为AND查询
         if not hasattr(index, 'positions') or not index.positions:
-            result1 = set(doc_id for doc_id, _ in index.postings.get(self.term1, []))
-            result2 = set(doc_id for doc_id, _ in index.postings.get(self.term2, []))
-            return result1 & result2
-
-        result = set()
+            arrs1 = index.postings_arrays(self.term1)
+            arrs2 = index.postings_arrays(self.term2)
+            if arrs1 is None or arrs2 is None:
+                return _EMPTY_IDS
+            return np.intersect1d(arrs1[0], arrs2[0], assume_unique=True)
 
         if self.term1 not in index.positions or self.term2 not in index.positions:
-            return result
+            return _EMPTY_IDS
 
         positions1 = index.positions.get(self.term1, {})
         positions2 = index.positions.get(self.term2, {})
 
-        # 查找共同文档
-        common_docs = set(positions1.keys()) & set(positions2.keys())
-
-        for doc_id in common_docs:
-            pos1 = sorted(positions1[doc_id])
-            pos2 = sorted(positions2[doc_id])
-
-            # 使用双指针法高效查找
-            i, j = 0, 0
-            found = False
-
-            while i < len(pos1) and j < len(pos2):
-                dist = abs(pos1[i] - pos2[j])
-                if dist <= self.distance:
-                    found = True
-                    break
-
-                if pos1[i] < pos2[j]:
-                    i += 1
-                else:
-                    j += 1
-
-            if found:
-                result.add(doc_id)
-
-        return result
+        # 共同文档走 posting 数组的有序归并（与 AND 同一条路径），
+        # 不再做 dict keys 的集合交；结果天然有序，结尾也不用再 sorted()
+        arrs1 = index.postings_arrays(self.term1)
+        arrs2 = index.postings_arrays(self.term2)
+        if arrs1 is None or arrs2 is None:
+            return _EMPTY_IDS
+        common_docs = np.intersect1d(arrs1[0], arrs2[0], assume_unique=True)
+        distance = self.distance
+        result: List[int] = []
+
+        for doc_id in common_docs.tolist():
+            # 位置数组天然有序；searchsorted 对每个 pos1 找出 pos2 中
+            # 左右两个最近邻，任一距离 <= distance 即命中。
+            # 转成有符号 int64，uint32 相减会回绕
+            pos1 = np.frombuffer(positions1[doc_id], dtype=np.uint32).astype(np.int64)
+            pos2 = np.frombuffer(positions2[doc_id], dtype=np.uint32).astype(np.int64)
+
+            idx = np.searchsorted(pos2, pos1)
+            left = pos2[np.clip(idx - 1, 0, pos2.size - 1)]
+            right = pos2[np.clip(idx, 0, pos2.size - 1)]
+            nearest = np.minimum(np.abs(pos1 - left), np.abs(pos1 - right))
+
+            if np.any(nearest <= distance):
+                result.append(doc_id)
+
+        return np.array(result, dtype=np.int32)
+
+    def estimated_size(self, index: IndexStore) -> int:
+        e1 = index.postings.get(self.term1)
+        e2 = index.postings.get(self.term2)
+        if e1 is None or e2 is None:
+            return 0
+        return min(len(e1[0]), len(e2[0]))
 
     def to_string(self, parent_precedence: int = 0) -> str:
         return f'#{self.distance}({self.term1},{self.term2})'
@@ -163,11 +218,16 @@ class NotNode(QueryNode):
     """NOT运算符节点"""
     operand: QueryNode
 
-    def evaluate(self, index: IndexStore) -> Set[str]:
+    def evaluate(self, index: IndexStore) -> np.ndarray:
         """评估NOT节点"""
-        all_docs = set(index.doc_len.keys())
+        # 内部 id 是稠密的 0..N-1，全集就是一个 arange（按索引版本缓存）
+        all_docs = index.all_docs_array()
         operand_result = self.operand.evaluate(index)
-        return all_docs - operand_result
+        return np.setdiff1d(all_docs, operand_result, assume_unique=True)
+
+    def estimated_size(self, index: IndexStore) -> int:
+        # 补集通常接近全集
+        return len(index.doc_len)
 
     def to_string(self, parent_precedence: int = 0) -> str:
         child_str = self.operand.to_string(self.precedence())
@@ -183,11 +243,28 @@ class AndNode(QueryNode):
     left: QueryNode
     right: QueryNode
 
-    def evaluate(self, index: IndexStore) -> Set[str]:
+    def evaluate(self, index: IndexStore) -> np.ndarray:
         """评估AND节点"""
-        left_result = self.left.evaluate(index)
-        right_result = self.right.evaluate(index)
-        return left_result & right_result
+        # 先评估估计结果更小的一侧；交集不会大于小侧，
+        # 小侧为空时另一侧完全不用求值
+        left, right = self.left, self.right
+        if right.estimated_size(index) < left.estimated_size(index):
+            left, right = right, left
+
+        small = left.evaluate(index)
+        if small.size == 0:
+            return _EMPTY_IDS
+
+        # X AND NOT Y 直接做差集，不物化 NOT 的 O(N) 补集
+        if isinstance(right, NotNode):
+            return np.setdiff1d(small, right.operand.evaluate(index),
+                                assume_unique=True)
+
+        return np.intersect1d(small, right.evaluate(index), assume_unique=True)
+
+    def estimated_size(self, index: IndexStore) -> int:
+        return min(self.left.estimated_size(index),
+                   self.right.estimated_size(index))
 
     def to_string(self, parent_precedence: int = 0) -> str:
         left_str = self.left.to_string(self.precedence())
@@ -209,11 +286,17 @@ class OrNode(QueryNode):
     left: QueryNode
     right: QueryNode
 
-    def evaluate(self, index: IndexStore) -> Set[str]:
+    def evaluate(self, index: IndexStore) -> np.ndarray:
         """评估OR节点"""
         left_result = self.left.evaluate(index)
         right_result = self.right.evaluate(index)
-        return left_result | right_result
+        # 两输入都有序去重，union1d 内部即一次归并
+        return np.union1d(left_result, right_result)
+
+    def estimated_size(self, index: IndexStore) -> int:
+        est = (self.left.estimated_size(index)
+               + self.right.estimated_size(index))
+        return min(est, len(index.doc_len))
 
     def to_string(self, parent_precedence: int = 0) -> str:
         left_str = self.left.to_string(self.precedence())
@@ -284,37 +367,22 @@ class QueryParser:
         Returns:
             List of (token_type, token_value) pairs
         """
-        # 定义token模式
-        patterns = [
-            ('PROXIMITY', r'#(\d+)\(([^,]+),([^)]+)\)'),
-            ('PHRASE', r'"([^"]+)"'),
-            ('NOT', r'\bNOT\b'),
-            ('AND', r'\bAND\b'),
-            ('OR', r'\bOR\b'),
-            ('LPAREN', r'\('),
-            ('RPAREN', r'\)'),
-            ('TERM', r'[^\s()"]+')
-        ]
-
-        pattern = '|'.join(f'(?P<{name}>{regex})' for name, regex in patterns)
+        # finditer 在 C 循环里一次扫完整个查询串；Python 这边只负责
+        # 检查相邻 match 之间的间隙是否全是空白（否则说明有非法 token）
         tokens = []
         pos = 0
 
-        while pos < len(query):
-            # 跳过空白字符
-            if query[pos].isspace():
-                pos += 1
-                continue
-
-            match = re.match(pattern, query[pos:], re.IGNORECASE)
-            if not match:
+        for match in _COMBINED_RE.finditer(query):
+            gap = query[pos:match.start()]
+            if gap and not gap.isspace():
                 raise ValueError(f'Invalid token at position {pos}: {query[pos:]}')
+            name = match.lastgroup
+            tokens.append((name, match.group(name)))
+            pos = match.end()
 
-            for name, value in match.groupdict().items():
-                if value is not None:
-                    tokens.append((name, value))
-                    pos += len(value)
-                    break
+        tail = query[pos:]
+        if tail and not tail.isspace():
+            raise ValueError(f'Invalid token at position {pos}: {query[pos:]}')
 
         return tokens
 
@@ -488,7 +556,7 @@ class QueryParser:
         target['max_depth'] = max(target.get('max_depth', 1), source['max_depth'])
 
 
-def parse_query(query: str, index: IndexStore) -> Set[str]:
+def parse_query(query: str, index: IndexStore) -> np.ndarray:
     """
     统一的查询解析接口
 
@@ -497,17 +565,18 @@ def parse_query(query: str, index: IndexStore) -> Set[str]:
         index: 索引存储
 
     Returns:
-        匹配的文档ID集合
+        匹配的内部文档ID（有序去重的 np.int32 数组，
+        经 index.reverse_doc_id_map 转回外部ID）
 
     Example:
         >>> parse_query('python AND "machine learning"', index)
-        {'doc1', 'doc2', ...}
+        array([0, 1, ...], dtype=int32)
 
         >>> parse_query('#5(artificial,intelligence) OR AI', index)
-        {'doc3', 'doc4', ...}
+        array([2, 3, ...], dtype=int32)
 
         >>> parse_query('(python OR java) AND NOT "web development"', index)
-        {'doc5', 'doc6', ...}
+        array([4, 5, ...], dtype=int32)
     """
     parser = QueryParser()
 
@@ -523,10 +592,10 @@ def parse_query(query: str, index: IndexStore) -> Set[str]:
     except ValueError as e:
         # 查询语法错误，返回空结果
         logger.warning(f"Query parsing error: {e} (query: '{query}')")
-        return set()
+        return _EMPTY_IDS
 
     except Exception as e:
         # 其他错误
         logger.error(f"Error evaluating query '{query}': {e}", exc_info=True)
-        return set()
+        return _EMPTY_IDS
 
@@ -2,38 +2,58 @@ from __future__ import annotations
 from typing import List
 import datetime
 import re
+import time
 import heapq
+import threading
+from operator import itemgetter
+
+from cachetools import LRUCache
 
 from ..schemas import SearchRequest, SearchResponse, SearchResult
 from ..storage.document_store import DocumentStore
 from ..storage.index_store import IndexStore
 from ..indexing.tokenizer import tokenize_en
 from .query_parser import parse_query
-from .bm25 import bm25_scores
+from .bm25 import bm25_scores, bm25_single_term_scores
 from ..utils.timing import timer_ms
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# PRF 扩展词缓存：同一个查询的扩展结果只和索引版本有关，
+# 命中后省掉一轮取 top 文档 + 重新分词统计的开销
+_PRF_CACHE: LRUCache = LRUCache(maxsize=2048)
+_PRF_LOCK = threading.Lock()
+
+# keyset 分页比较分数时的浮点容差（分数是 float32 算出来的）
+_SCORE_EPS = 1e-6
+
+# 查询词提取用的正则，模块加载时编译一次（原来每个查询都重新 compile）
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+_PROX_RE = re.compile(r'#\d+\(([^,]+),([^)]+)\)')
+_BOOL_OP_RE = re.compile(r'\b(?:AND|OR|NOT)\b', re.IGNORECASE)
+_PAREN_RE = re.compile(r'[()]')
+_WORD_RE = re.compile(r'\b\w+\b')
+# 复杂查询探测：短语/邻近/括号，或被空格包围的布尔操作符
+# （和原先 query.upper() + " AND " in ... 的判定语义一致）
+_COMPLEX_PROBE_RE = re.compile(r'[#(]| (?:AND|OR|NOT) ', re.IGNORECASE)
+_NON_SIMPLE_RE = re.compile(r'[#"()]| (?:AND|OR|NOT) ', re.IGNORECASE)
+
 
 # 生成结果摘要
-def _make_snippet(text: str, terms: List[str], max_len: int = 180) -> str:
-    """生成结果摘要，基于查询词"""
+def _make_snippet(text: str, lower: str, pattern: re.Pattern | None,
+                  max_len: int = 180) -> str:
+    """生成结果摘要。lower 是 text 的小写副本（Document.body_lower），
+    pattern 是所有查询词拼成的 alternation（每个查询编译一次），
+    一趟扫描找到首个命中词，代替逐词 find 的多趟线性扫。"""
     if not text:
         return ""
 
-    lower = text.lower()
-    pos = -1
-
-    for t in terms:
-        p = lower.find(t.lower())
-        if p != -1:
-            pos = p
-            break
-    if pos == -1:
+    m = pattern.search(lower) if pattern is not None else None
+    if m is None:
         start = 0
     else:
-        start = max(0, pos - 60)
+        start = max(0, m.start() - 60)
 
     end = start + max_len
 
@@ -53,47 +73,51 @@ def _make_snippet(text: str, terms: List[str], max_len: int = 180) -> str:
     return snippet.replace("\n", " ").strip()
 
 
+def _parse_ts(value: str | None) -> float | None:
+    """ISO 时间串 -> epoch 秒；空值或解析失败返回 None（best-effort）。"""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(
+            value.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
 # 过滤文档
-def _filter_doc(doc, filters) -> bool:
+# 过滤边界 t0/t1 由调用方对整个查询解析一次（_parse_ts），
+# 文档侧用缓存的 doc.ts_epoch，这里只剩 float 比较
+def _filter_doc(doc, filters, t0: float | None = None, t1: float | None = None) -> bool:
     if not filters:
         return True
     if filters.lang and doc.lang != filters.lang:
         return False
 
-    # time filter (best-effort ISO compare)
-    if (filters.time_from or filters.time_to) and doc.timestamp:
-        try:
-            ts = datetime.datetime.fromisoformat(doc.timestamp.replace("Z", "+00:00"))
-            if filters.time_from:
-                t0 = datetime.datetime.fromisoformat(filters.time_from.replace("Z", "+00:00"))
-                if ts < t0:
-                    return False
-            if filters.time_to:
-                t1 = datetime.datetime.fromisoformat(filters.time_to.replace("Z", "+00:00"))
-                if ts > t1:
-                    return False
-        except Exception:
-            pass
+    if t0 is not None or t1 is not None:
+        ts = doc.ts_epoch
+        if ts is not None:
+            if t0 is not None and ts < t0:
+                return False
+            if t1 is not None and ts > t1:
+                return False
 
     return True
 
 
 # Freshness boosting (for live/monitoring scenario)
-def _freshness_boosted_score(score: float, timestamp: str | None, lam: float = 0.2, tau_hours: float = 72.0) -> float:
+def _freshness_boosted_score(score: float, ts_epoch: float | None, now: float,
+                             lam: float = 0.2, tau_hours: float = 72.0) -> float:
     """Apply a lightweight recency boost to a BM25 score.
 
-    score'=score*(1+lam*exp(-age/tau)). For missing/invalid timestamps, return the original score.
+    score'=score*(1+lam*exp(-age/tau)). Takes the doc's cached epoch
+    timestamp (None for missing/invalid, which returns the original score)
+    and a `now` computed once per query.
     """
-    if not timestamp:
-        return score
-    try:
-        ts = datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-        now = datetime.datetime.now(datetime.timezone.utc)
-        age_hours = max(0.0, (now - ts).total_seconds() / 3600.0)
-        boost = lam * (2.718281828 ** (-age_hours / tau_hours))
-        return score * (1.0 + boost)
-    except Exception:
+    if ts_epoch is None:
         return score
+    age_hours = max(0.0, (now - ts_epoch) / 3600.0)
+    boost = lam * (2.718281828 ** (-age_hours / tau_hours))
+    return score * (1.0 + boost)
 
 
 def _extract_query_terms(query: str) -> List[str]:
@@ -104,19 +128,19 @@ def _extract_query_terms(query: str) -> List[str]:
     对于复杂查询：提取所有词项，忽略操作符
     """
     # 如果是简单查询（不包含布尔操作符），直接分词
-    if not any(op in query.upper() for op in [" AND ", " OR ", " NOT ", "#", "("]):
+    if _COMPLEX_PROBE_RE.search(query) is None:
         return tokenize_en(query)
 
     # 对于复杂查询，提取所有词项
     terms = []
 
     # 1. 提取短语中的词项
-    phrase_matches = re.findall(r'"([^"]+)"', query)
+    phrase_matches = _PHRASE_RE.findall(query)
     for phrase in phrase_matches:
         terms.extend(tokenize_en(phrase))
 
     # 2. 提取邻近查询中的词项
-    proximity_matches = re.findall(r'#\d+\(([^,]+),([^)]+)\)', query)
+    proximity_matches = _PROX_RE.findall(query)
     for term1, term2 in proximity_matches:
         terms.extend(tokenize_en(term1.strip()))
         terms.extend(tokenize_en(term2.strip()))
@@ -130,42 +154,22 @@ def _extract_query_terms(query: str) -> List[str]:
         cleaned_query = cleaned_query.replace(f'#({term1},{term2})', '')
 
     # 移除布尔操作符
-    cleaned_query = re.sub(r'\b(?:AND|OR|NOT)\b', ' ', cleaned_query, flags=re.IGNORECASE)
+    cleaned_query = _BOOL_OP_RE.sub(' ', cleaned_query)
     # 移除括号
-    cleaned_query = re.sub(r'[()]', ' ', cleaned_query)
+    cleaned_query = _PAREN_RE.sub(' ', cleaned_query)
 
     # 提取剩余词项
-    for word in re.findall(r'\b\w+\b', cleaned_query.lower()):
-        if word and word not in ['and', 'or', 'not']:
+    for word in _WORD_RE.findall(cleaned_query.lower()):
+        if word and word not in ('and', 'or', 'not'):
             terms.extend(tokenize_en(word))
 
-    return list(set(terms))  # 去重
+    # 去重但保持首次出现顺序（list(set(...)) 的顺序随哈希抖动）
+    return list(dict.fromkeys(terms))
 
 
 def _is_simple_query(query: str) -> bool:
-    """判断是否为简单查询（不包含布尔操作符、短语、邻近查询）"""
-    # 检查是否包含布尔操作符
-    if any(op in query.upper() for op in [" AND ", " OR ", " NOT "]):
-        return False
-
-    # 检查是否包含邻近查询
-    if '#' in query:
-        return False
-
-    # 检查是否包含短语查询
-    if '"' in query:
-        return False
-
-    # 检查是否包含括号
-    if '(' in query or ')' in query:
-        return False
-
-    return True
-
-
-def _filter_scores_by_docs(scores: dict, target_docs: set) -> dict:
-    """过滤分数，只保留目标文档的分数"""
-    return {doc_id: score for doc_id, score in scores.items() if doc_id in target_docs}
+    """判断是否为简单查询（不包含布尔操作符、短语、邻近查询、括号）"""
+    return _NON_SIMPLE_RE.search(query) is None
 
 
 # 搜索
@@ -187,11 +191,30 @@ def search(req: SearchRequest, store: DocumentStore, index: IndexStore, prf_expa
     # BM25
     with timer_ms() as took:
         # 1. 使用parse_query执行查询解析，获取匹配的文档
-        # `parse_query` returns internal doc ids (ints) that correspond to IndexStore.doc_id_map.
-        matched_docs = parse_query(req.query, index)
+        # 单词项查询是搜索流量的大头，走专门的快路径：该词的倒排表本身
+        # 就是匹配集，缓存的贡献向量就是逐文档 BM25 分数，语法树求值、
+        # 词项提取、isin 掩码全都省掉。
+        # 判定必须和 QueryParser 的词法一致：解析器按 \b 匹配 AND/OR/NOT
+        # （不要求两侧空格），而这些操作符词又会被停用词表吞掉——
+        # "NOT python" 分词后只剩 ['python']，按 token 数判定会把补集
+        # 查询当成单词项查询。原始串里出现任何操作符词就不走快路径。
+        single_term = None
+        if _is_simple_query(req.query) and _BOOL_OP_RE.search(req.query) is None:
+            tokens = tokenize_en(req.query)
+            if len(tokens) == 1:
+                single_term = tokens[0]
+
+        if single_term is not None:
+            query_terms = [single_term]
+            scores = bm25_single_term_scores(single_term, index)
+            arrs = index.postings_arrays(single_term)
+            matched_docs = arrs[0] if arrs is not None else ()
+        else:
+            # `parse_query` returns a sorted np.int32 array of internal doc ids.
+            matched_docs = parse_query(req.query, index)
 
         # 2. 如果没有匹配的文档，直接返回空结果
-        if not matched_docs:
+        if len(matched_docs) == 0:
             return SearchResponse(
                 query=req.query,
                 took_ms=took(),
@@ -199,35 +222,58 @@ def search(req: SearchRequest, store: DocumentStore, index: IndexStore, prf_expa
                 results=[]
             )
 
-        # 3. 提取查询词项用于BM25计算
-        query_terms = _extract_query_terms(req.query)
+        if single_term is None:
+            # 3. 提取查询词项用于BM25计算
+            query_terms = _extract_query_terms(req.query)
 
-        # 4. 只计算匹配文档的BM25分数
-        scores = bm25_scores(query_terms, index, target_docs=matched_docs)
+            # 4. 只计算匹配文档的BM25分数
+            # 这里走 target_docs 路径而不是 bm25_top_k 的 MaxScore 剪枝路径：
+            # 过滤器和 keyset 分页都要看全部候选的完整分数，剪枝给出的部分
+            # 分数会让翻页边界和 total_hits 出错。只要前k且无过滤时请直接用
+            # bm25_top_k（全量路径自动启用 MaxScore）。
+            scores = bm25_scores(query_terms, index, target_docs=matched_docs)
 
         # 5. PRF扩展（仅对简单查询启用）
         if req.use_prf and prf_expand is not None and _is_simple_query(req.query):
-            # 获取前几个文档进行扩展
-            top_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:5]
-
-            if top_docs:
-                # 扩展查询词
-                # PRF works with external doc_id strings.
-                top_ext_ids = [index.reverse_doc_id_map.get(internal_id) for internal_id, _ in top_docs]
-                top_ext_ids = [x for x in top_ext_ids if x is not None]
-                expanded_terms = prf_expand(req.query, top_ext_ids, store)
-                if expanded_terms:
-                    # 合并原始词项和扩展词项
-                    all_terms = query_terms + expanded_terms
-
-                    # 用扩展词重新计算分数（仍然只计算匹配文档）
-                    expanded_scores = bm25_scores(all_terms, index, target_docs=matched_docs)
-
-                    # 合并分数：取最大值
-                    for doc_id, score in expanded_scores.items():
-                        scores[doc_id] = max(scores.get(doc_id, 0.0), score)
+            # 扩展词只依赖 (查询, 索引版本)，先查缓存
+            prf_key = (req.query, index.index_version)
+            with _PRF_LOCK:
+                expanded_terms = _PRF_CACHE.get(prf_key)
+
+            if expanded_terms is None:
+                expanded_terms = []
+
+                # 获取前几个文档进行扩展（只要前5个，不用对全部命中排序）
+                top_docs = heapq.nlargest(5, scores.items(), key=itemgetter(1))
+
+                if top_docs:
+                    # 扩展查询词
+                    # PRF works with external doc_id strings.
+                    top_ext_ids = [index.reverse_doc_id_map.get(internal_id) for internal_id, _ in top_docs]
+                    top_ext_ids = [x for x in top_ext_ids if x is not None]
+                    expanded_terms = prf_expand(req.query, top_ext_ids, store) or []
+
+                # 空结果也缓存：没有扩展词本身就是这个查询的答案
+                with _PRF_LOCK:
+                    _PRF_CACHE[prf_key] = expanded_terms
+
+            if expanded_terms:
+                # 合并原始词项和扩展词项
+                all_terms = query_terms + expanded_terms
+
+                # 用扩展词重新计算分数（仍然只计算匹配文档）
+                expanded_scores = bm25_scores(all_terms, index, target_docs=matched_docs)
+
+                # 合并分数：取最大值
+                for doc_id, score in expanded_scores.items():
+                    scores[doc_id] = max(scores.get(doc_id, 0.0), score)
 
         # 6. 排序结果:使用小根堆进行排序
+        # 时间过滤边界和"现在"整个查询只解析/取一次，循环里全是 float 比较
+        t0 = _parse_ts(req.filters.time_from) if req.filters else None
+        t1 = _parse_ts(req.filters.time_to) if req.filters else None
+        now = time.time()
+
         heap = []  # 小根堆，存储(score, doc_id)
         for internal_id, score in scores.items():
             ext_id = index.reverse_doc_id_map.get(internal_id)
@@ -238,26 +284,31 @@ def search(req: SearchRequest, store: DocumentStore, index: IndexStore, prf_expa
                 continue
 
             # 应用文档过滤器
-            if not _filter_doc(doc, req.filters):
+            if not _filter_doc(doc, req.filters, t0, t1):
                 continue
 
             # sort mode (default: relevance)
             final_score = score
             if req.filters and getattr(req.filters, 'sort', None) == 'freshness':
-                final_score = _freshness_boosted_score(score, doc.timestamp)
+                final_score = _freshness_boosted_score(score, doc.ts_epoch, now)
 
-            # 应用分页过滤器
+            # 应用分页过滤器（keyset 分页，按 (score desc, doc_id asc) 全序）
             if req.last_min_bm25_score is not None and req.last_max_rerank_id is not None:
                 # 分页逻辑：跳过之前已经返回的文档
                 # 条件1：得分必须小于上次的最小得分（因为我们是降序排列）
                 # 条件2：如果得分相等，doc_id必须大于上次的最大doc_id（用于稳定排序）
-                if final_score > req.last_min_bm25_score:
+                # 分数经过 float32 累加/转换，"相等"要留容差，严格 == 会把
+                # 同一文档在翻页边界上重复返回或漏掉
+                if final_score > req.last_min_bm25_score + _SCORE_EPS:
                     continue  # 得分太高，这是之前页的结果
-                elif final_score == req.last_min_bm25_score and ext_id <= req.last_max_rerank_id:
+                elif (abs(final_score - req.last_min_bm25_score) <= _SCORE_EPS
+                      and ext_id <= req.last_max_rerank_id):
                     continue  # 得分相同但doc_id不够大，这也是之前页的结果
 
             # 使用小根堆保存 top_k
-            heap_item = (final_score, ext_id)
+            # doc 一并放进堆里，结果组装阶段不用再查一次 store；
+            # (score, ext_id) 在循环内唯一，元组比较不会落到 doc 上
+            heap_item = (final_score, ext_id, doc)
 
             if len(heap) < req.top_k:
                 heapq.heappush(heap, heap_item)
@@ -272,18 +323,26 @@ def search(req: SearchRequest, store: DocumentStore, index: IndexStore, prf_expa
                         heapq.heappushpop(heap, heap_item)
 
         # 7. 过滤和格式化结果
-        results: List[SearchResult] = []
-        while heap:
-            score, ext_id = heapq.heappop(heap)
-            doc = store.get(ext_id)
-
-            # 为摘要生成提取词项（使用原始查询）
+        # 摘要定位用的词项和 alternation 正则只和查询有关，整个查询编译一次
+        # （分词结果本身就是小写，在小写正文上做大小写敏感匹配即可）；
+        # 一条结果都没有时连提取/编译这步也省掉
+        snippet_pattern = None
+        if heap:
             if _is_simple_query(req.query):
                 snippet_terms = tokenize_en(req.query)
             else:
                 snippet_terms = _extract_query_terms(req.query)
+            # 长词排前面：同一位置上有前缀关系的词（词干化后常见）优先
+            # 命中更长的那个，摘要锚点更贴近完整词
+            if snippet_terms:
+                snippet_pattern = re.compile("|".join(
+                    re.escape(t) for t in sorted(snippet_terms, key=len, reverse=True)))
+
+        results: List[SearchResult] = []
+        while heap:
+            score, ext_id, doc = heapq.heappop(heap)
 
-            snippet = _make_snippet(doc.body, snippet_terms)
+            snippet = _make_snippet(doc.body, doc.body_lower, snippet_pattern)
 
             results.append(SearchResult(
                 doc_id=doc.doc_id,
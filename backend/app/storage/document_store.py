@@ -51,14 +51,14 @@ class DocumentStore:
     def save_to_disk(self, filepath: Optional[str] = None) -> None:
         fp = filepath or self._filepath
         os.makedirs(os.path.dirname(fp), exist_ok=True)
-        with open(fp, "wb") as f:
-            pickle.dump(self, f)
+        with open(fp, "wb", buffering=1 << 20) as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
 
     @classmethod
     def load_from_disk(cls, filepath: str) -> "DocumentStore":
         if not os.path.exists(filepath):
             return cls()
-        with open(filepath, "rb") as f:
+        with open(filepath, "rb", buffering=1 << 20) as f:
             obj = pickle.load(f)
         # Backward/forward compatibility: accept either a DocumentStore instance
         # or a raw dict (older code).
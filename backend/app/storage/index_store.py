@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass, field
 from typing import Dict, List, Tuple, Optional
+import math
 import pickle
 import os
 
+import numpy as np
+
 from ..config import DATA_DIR
 
 
@@ -14,19 +18,25 @@ from ..config import DATA_DIR
 class IndexStore:
     """
     索引数据结构
+
+    外部 doc_id 字符串只在 doc_id_map / reverse_doc_id_map 各存一份，
+    倒排表和位置索引里一律用稠密的内部 int id（0..N-1）：每条 posting
+    只占 4 字节，而不是携带一个 Python 字符串。结果组装时才换回外部 id。
     """
 
-    # 1. 倒排表
-    # Term -> [(Internal_DocID, Frequency)]
-    postings: Dict[str, List[Tuple[int, int]]] = field(default_factory=dict)
+    # 1. 倒排表（SoA 布局：两条平行数组，省掉每条 posting 的 tuple/int 装箱开销）
+    # Term -> (array('I') of Internal_DocID, array('I') of Frequency)
+    postings: Dict[str, Tuple[array, array]] = field(default_factory=dict)
 
     # 2. 文档长度
     # Internal_DocID -> Length
     doc_len: Dict[int, int] = field(default_factory=dict)
 
     # 3. 位置索引
-    # Term -> {Internal_DocID: [pos1, pos2, ...]}
-    positions: Dict[str, Dict[int, List[int]]] = field(default_factory=dict)
+    # Term -> {Internal_DocID: array('I') of positions}
+    # 不变式：位置数组按升序存储（索引时按 token 顺序追加，天然有序）。
+    # 短语/邻近查询的二分和 searchsorted 都依赖这一点，勿乱序写入。
+    positions: Dict[str, Dict[int, array]] = field(default_factory=dict)
 
     # 4. ID 映射
     doc_id_map: Dict[str, int] = field(default_factory=dict)
@@ -35,12 +45,128 @@ class IndexStore:
     # 5. 文档元数据
     doc_metadata: Dict[int, dict] = field(default_factory=dict)
 
-    # 6. 版本号（用于health check / debugging）
+    # 6. 文档长度总和（索引时增量维护，avgdl 因此是 O(1) 读取）
+    total_dl: int = 0
+
+    # 7. 版本号（用于health check / debugging）
     index_version: str = "0"
 
     _filepath: str = field(default_factory=lambda: str(DATA_DIR / "index.pkl"))
 
+    @property
+    def avgdl(self) -> float:
+        """平均文档长度。total_dl 在索引时增量维护，这里不再对全库求和。"""
+        n = len(self.doc_len)
+        return (self.total_dl / n) if n else 0.0
+
+    # =========================
+    # NumPy 派生视图（懒构建，查询热路径用）
+    # =========================
+    def _invalidate_derived(self) -> None:
+        """索引内容变化后丢弃所有派生缓存（NumPy 视图、IDF 等）。"""
+        self.__dict__.pop("_np_postings", None)
+        self.__dict__.pop("_doc_len_arr", None)
+        self.__dict__.pop("_idf_cache", None)
+        self.__dict__.pop("_contrib_cache", None)
+        self.__dict__.pop("_all_docs_arr", None)
+
+    def idf(self, term: str) -> Optional[float]:
+        """
+        某词项的 BM25 IDF（+1 平滑版本）；词项不存在返回 None。
+
+        IDF 只随 N/df 变化，也就是只在 ingest 时变化，所以按词项懒缓存，
+        bump_version 时整体失效，查询路径不再每次调用 math.log。
+        """
+        cache = self.__dict__.get("_idf_cache")
+        if cache is None:
+            cache = self.__dict__["_idf_cache"] = {}
+        val = cache.get(term)
+        if val is None:
+            entry = self.postings.get(term)
+            if entry is None:
+                return None
+            df = len(entry[0])
+            n = max(1, len(self.doc_len))
+            val = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            cache[term] = val
+        return val
+
+    def postings_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        返回某个词项的 (doc_ids int32, tfs float32) NumPy 数组；词项不存在返回 None。
+
+        按词项懒构建并缓存（只有查询词会被转换），在 bump_version 时失效。
+        BM25 的内层算术因此走 NumPy 的向量化路径而不是逐条 Python 循环。
+        """
+        cache = self.__dict__.get("_np_postings")
+        if cache is None:
+            cache = self.__dict__["_np_postings"] = {}
+        arrs = cache.get(term)
+        if arrs is None:
+            entry = self.postings.get(term)
+            if entry is None:
+                return None
+            doc_ids, tfs = entry
+            # array('I') 的 buffer 直接零拷贝读出，再一次性转成目标 dtype
+            arrs = (
+                np.frombuffer(doc_ids, dtype=np.uint32).astype(np.int32),
+                np.frombuffer(tfs, dtype=np.uint32).astype(np.float32),
+            )
+            cache[term] = arrs
+        return arrs
+
+    def contrib_arrays(self, term: str,
+                       k1: float, b: float) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        某词项的 (doc_ids, 预计算BM25贡献) 数组；词项不存在返回 None。
+
+        BM25 Turbo 思路：idf * tf*(k1+1) / (tf + k1*(1-b+b*dl/avgdl)) 对
+        每个 (term, doc) 在索引版本内是常量，按 (term, k1, b) 懒缓存后，
+        热门词项的查询就只剩 gather + 累加，零算术。bump_version 失效。
+        """
+        cache = self.__dict__.get("_contrib_cache")
+        if cache is None:
+            cache = self.__dict__["_contrib_cache"] = {}
+        key = (term, k1, b)
+        entry = cache.get(key)
+        if entry is None:
+            arrs = self.postings_arrays(term)
+            idf = self.idf(term)
+            if arrs is None or idf is None:
+                return None
+            doc_ids, tfs = arrs
+            dl = self.doc_len_array()[doc_ids]
+            avgdl = self.avgdl or 1.0
+            denom = tfs + k1 * (1.0 - b + b * (dl / avgdl))
+            contrib = (idf * (tfs * (k1 + 1.0)) / denom).astype(np.float32)
+            entry = (doc_ids, contrib)
+            cache[key] = entry
+        return entry
+
+    def all_docs_array(self) -> np.ndarray:
+        """全集（内部 id 0..N-1）的 int32 数组，NOT 求值用。
+
+        按索引版本缓存一份，NOT 不再每次 evaluate 都重新 arange。
+        调用方把它当只读视图，不要原地修改。
+        """
+        arr = self.__dict__.get("_all_docs_arr")
+        if arr is None:
+            arr = np.arange(len(self.doc_len), dtype=np.int32)
+            self.__dict__["_all_docs_arr"] = arr
+        return arr
+
+    def doc_len_array(self) -> np.ndarray:
+        """内部 id -> 文档长度的 float32 数组（内部 id 是稠密的 0..N-1）。"""
+        arr = self.__dict__.get("_doc_len_arr")
+        if arr is None:
+            arr = np.ones(len(self.doc_id_map), dtype=np.float32)
+            for internal_id, dl in self.doc_len.items():
+                arr[internal_id] = dl or 1
+            self.__dict__["_doc_len_arr"] = arr
+        return arr
+
     def bump_version(self) -> str:
+        self._invalidate_derived()
         try:
             v = int(self.index_version)
             v += 1
@@ -50,6 +176,18 @@ class IndexStore:
             self.index_version = "1"
         return self.index_version
 
+    def __getstate__(self):
+        """序列化时剔除派生缓存（NumPy 视图、IDF/贡献表）。
+
+        这些缓存能从原始 postings 重建，落盘只会成倍放大文件、拖慢
+        dump/load，而且加载后本来就要失效重建。pickle 里只留原始索引数据。
+        """
+        state = self.__dict__.copy()
+        for key in ("_np_postings", "_doc_len_arr", "_idf_cache",
+                    "_contrib_cache", "_all_docs_arr"):
+            state.pop(key, None)
+        return state
+
     # =========================
     # 保存
     # =========================
@@ -57,8 +195,10 @@ class IndexStore:
         filepath = filepath or self._filepath
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
-        with open(filepath, "wb") as f:
-            pickle.dump(self, f)
+        # Protocol 5 + a large write buffer: faster dumps and smaller files
+        # than the default protocol for a big postings dict.
+        with open(filepath, "wb", buffering=1 << 20) as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
 
     # =========================
     # 加载
@@ -68,7 +208,9 @@ class IndexStore:
         if not os.path.exists(filepath):
             return cls()
 
-        with open(filepath, "rb") as f:
+        # Large read buffer to mirror the save path; the pickle stream is
+        # consumed sequentially in one pass.
+        with open(filepath, "rb", buffering=1 << 20) as f:
             obj = pickle.load(f)
         # Accept old pickles that may not contain new fields.
         if isinstance(obj, cls):
@@ -76,9 +218,26 @@ class IndexStore:
                 obj.index_version = "0"
             if not getattr(obj, "_filepath", None):
                 obj._filepath = filepath
+            if not getattr(obj, "total_dl", 0) and obj.doc_len:
+                # 老 pickle 没有 total_dl：加载时一次性补算
+                obj.total_dl = sum(obj.doc_len.values())
+            obj._migrate_postings()
             return obj
         return cls()
 
+    def _migrate_postings(self) -> None:
+        """老 pickle 里 postings 是 [(doc_id, tf), ...]、positions 是 list；转成 SoA 数组。"""
+        for term, plist in self.postings.items():
+            if isinstance(plist, list):
+                self.postings[term] = (
+                    array("I", (doc_id for doc_id, _ in plist)),
+                    array("I", (tf for _, tf in plist)),
+                )
+        for by_doc in self.positions.values():
+            for doc_id, pos_list in by_doc.items():
+                if isinstance(pos_list, list):
+                    by_doc[doc_id] = array("I", pos_list)
+
     def load_if_exists(self) -> None:
         if not os.path.exists(self._filepath):
             return
@@ -89,7 +248,9 @@ class IndexStore:
         self.doc_id_map = loaded.doc_id_map
         self.reverse_doc_id_map = loaded.reverse_doc_id_map
         self.doc_metadata = loaded.doc_metadata
+        self.total_dl = loaded.total_dl
         self.index_version = loaded.index_version
+        self._invalidate_derived()
 
     def persist(self) -> None:
         self.save_to_disk(self._filepath)
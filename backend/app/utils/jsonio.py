@@ -0,0 +1,27 @@
+"""JSON helpers: orjson-backed when available, stdlib json fallback.
+
+orjson is 3-10x faster than the stdlib on the ingest-state payloads
+(hundreds of thousands of seen_ids), which the scheduler serializes often.
+"""
+import json
+
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
+
+
+def loads(data):
+    """Parse JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return json.loads(data)
+
+
+def dumps_indent2(obj) -> bytes:
+    """Serialize with 2-space indent (the state-file format), as UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
@@ -0,0 +1,41 @@
+"""Score a batch of queries offline against the persisted index.
+Usage:
+  python scripts/batch_eval.py <queries.txt> [top_k]
+
+One query per line. All queries are scored in a single bm25_scores_batch
+call so each term's posting arithmetic is shared across queries.
+"""
+import sys
+import heapq
+from operator import itemgetter
+from pathlib import Path
+
+# Allow running from repo root
+sys.path.append(str(Path(__file__).resolve().parents[1] / "backend"))
+
+from app.storage.index_store import IndexStore
+from app.indexing.tokenizer import tokenize_en
+from app.search.bm25 import bm25_scores_batch
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    queries_path = Path(sys.argv[1])
+    top_k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    queries = [q.strip() for q in queries_path.read_text(encoding="utf-8").splitlines()
+               if q.strip()]
+    index = IndexStore()
+    index.load_if_exists()
+
+    batch = bm25_scores_batch([tokenize_en(q) for q in queries], index)
+    for query, scores in zip(queries, batch):
+        top = heapq.nlargest(top_k, scores.items(), key=itemgetter(1))
+        print(query)
+        for internal_id, score in top:
+            ext_id = index.reverse_doc_id_map.get(internal_id, "?")
+            print(f"  {ext_id}\t{score:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Regression check: pruned bm25_top_k must agree with exhaustive bm25_scores.
+Usage:
+  python scripts/check_bm25_prune.py
+
+Covers the adversarial MaxScore case — a low-idf term (processed last)
+whose high-tf docs are the true top hits must not be pruned away — plus
+randomized corpora compared against the exhaustive ranking. Exits
+non-zero on the first mismatch.
+"""
+import random
+import sys
+from pathlib import Path
+
+# Allow running from repo root
+sys.path.append(str(Path(__file__).resolve().parents[1] / "backend"))
+
+from app.schemas import Document
+from app.storage.index_store import IndexStore
+from app.indexing.indexer import build_index
+from app.search.bm25 import bm25_scores, bm25_top_k
+
+
+def build(docs_bodies):
+    docs = [Document(doc_id=f"d{i}", title=f"t{i}", body=body)
+            for i, body in enumerate(docs_bodies)]
+    index = IndexStore(_filepath="/tmp/check_bm25_prune.pkl")
+    build_index(docs, index)
+    return index
+
+
+def assert_topk_matches(index, terms, k):
+    full = bm25_scores(terms, index)
+    want = sorted(full.items(), key=lambda kv: -kv[1])[:k]
+    got = bm25_top_k(terms, index, top_k=k)
+    assert len(got) == len(want), (terms, k, got, want)
+    for (gd, gs), (wd, ws) in zip(got, want):
+        assert abs(gs - ws) < 1e-5, (terms, k, got, want)
+        # on exact score ties the doc order may differ; ids must match otherwise
+        assert gd == wd or abs(gs - ws) < 1e-6, (terms, k, got, want)
+
+
+def main():
+    # Adversarial case: "alpha" has the higher idf (df=3 vs df=4) and is
+    # processed first with tf=1; "beta" carries tf=50 in two docs whose
+    # saturated scores still beat every alpha doc, so the true top-2 are
+    # beta-only docs the old prune dropped.
+    bodies = [
+        "alpha fillerone fillertwo fillerthree",
+        "alpha fillerfour fillerfive fillersix",
+        "alpha fillerseven fillereight fillernine",
+        " ".join(["beta"] * 50),
+        " ".join(["beta"] * 50),
+        "beta fillerten",
+        "beta fillereleven",
+        "fillertwelve fillerthirteen fillerfourteen",
+        "fillerfifteen fillersixteen",
+        "fillerseventeen fillereighteen",
+    ]
+    index = build(bodies)
+    for k in (1, 2, 3, 5, 7):
+        assert_topk_matches(index, ["alpha", "beta"], k)
+    top2 = [doc for doc, _ in bm25_top_k(["alpha", "beta"], index, top_k=2)]
+    high_tf_docs = {index.doc_id_map["d3"], index.doc_id_map["d4"]}
+    assert set(top2) == high_tf_docs, top2
+
+    # Randomized corpora: pruned path must reproduce the exhaustive ranking
+    # for arbitrary term mixes and cutoffs.
+    rng = random.Random(42)
+    vocab = [f"word{c}" for c in "abcdefghijklmnopqrstuvwxyz"]
+    for trial in range(5):
+        bodies = [" ".join(rng.choices(vocab, k=rng.randint(5, 120)))
+                  for _ in range(60)]
+        index = build(bodies)
+        for _ in range(20):
+            terms = rng.sample(vocab, rng.randint(2, 5))
+            assert_topk_matches(index, terms, rng.choice((1, 3, 5, 10)))
+
+    print("BM25 PRUNE CHECK OK")
+
+
+if __name__ == "__main__":
+    main()